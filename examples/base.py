@@ -1,18 +1,79 @@
 from flask import Flask
+import asyncio
+import logging
 import os as os
+import threading
+
+try:
+    import orjson
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """serialize the json responses with `orjson`, it is much faster than `json`."""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=self.default).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+
+class MailSender:
+    """
+    send the messages from a background thread which runs its own event loop,
+    the views only queue the message and return without waiting for SMTP.
+    The loop lives as long as the app so the connection pool stays warm.
+    """
+
+    def __init__(self, mail):
+        self.mail = mail
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def put(self, message, template_name=None):
+        future = asyncio.run_coroutine_threadsafe(
+            self._send(message, template_name), self.loop
+        )
+        future.add_done_callback(self._log_error)
+        return future
+
+    async def _send(self, message, template_name):
+        async with self.mail.acquire() as conn:
+            await self.mail.send_message(
+                message, template_name=template_name, connection=conn
+            )
+
+    @staticmethod
+    def _log_error(future):
+        if future.exception() is not None:
+            logging.getLogger(__name__).error(
+                "sending email failed", exc_info=future.exception()
+            )
+
+
+# read once, so every create_app() call reuses the same settings
+MAIL_SETTINGS = dict(
+    MAIL_USERNAME=os.environ['MAIL_USERNAME'],
+    MAIL_PASSWORD=os.environ['MAIL_PASSWORD'],
+    # MAIL_FROM="aniketsarkar1998@gmail.com",
+    MAIL_PORT=os.environ['MAIL_PORT'],
+    MAIL_SERVER=os.environ['MAIL_HOST'],
+    MAIL_USE_TLS=True,
+    MAIL_USE_SSL=False,
+    VALIDATE_CERTS=False,
+    # MAIL_TEMPLATE_FOLDER=Path(__file__).parent / 'attachments',
+)
 
 
 def create_app():
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
 
-    app.config['MAIL_USERNAME'] = os.environ['MAIL_USERNAME']
-    app.config['MAIL_PASSWORD'] = os.environ['MAIL_PASSWORD']
-    # app.config['MAIL_FROM'] = "aniketsarkar1998@gmail.com"
-    app.config['MAIL_PORT'] = os.environ['MAIL_PORT']
-    app.config['MAIL_SERVER'] = os.environ['MAIL_HOST']
-    app.config['MAIL_USE_TLS'] = True
-    app.config['MAIL_USE_SSL'] = False
-    app.config['VALIDATE_CERTS'] = False
-    # app.config['MAIL_TEMPLATE_FOLDER'] = Path(__file__).parent / 'attachments'
+    app.config.update(MAIL_SETTINGS)
     
     return app
\ No newline at end of file
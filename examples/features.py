@@ -1,12 +1,25 @@
+import time
+
 from base import create_app
 from flask_mailing.utils import DefaultChecker
+from flask_mailing.utils.email_check import TEMP_DOMAINS_TTL
 from flask import jsonify
 
 app = create_app()
 
+# one checker for the whole app, you can pass source argument for your own email domains
+checker = DefaultChecker()
+last_fetch = None
+
 async def default_checker():
-    checker = DefaultChecker()  # you can pass source argument for your own email domains
-    await checker.fetch_temp_email_domains() # require to fetch temporary email domains
+    # fetch the temporary email domains on the first request and refresh them
+    # lazily, Flask runs every async view in its own event loop so a
+    # background refresh task would not survive the request.
+    global last_fetch
+    # the downloaded list itself is cached for TEMP_DOMAINS_TTL seconds
+    if last_fetch is None or time.monotonic() - last_fetch > TEMP_DOMAINS_TTL:
+        await checker.fetch_temp_email_domains()
+        last_fetch = time.monotonic()
     return checker
 
 @app.get('/email/dispasoble')
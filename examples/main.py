@@ -1,12 +1,14 @@
 from dotenv import load_dotenv; load_dotenv()
 
 from flask import jsonify
-from base import create_app
+from base import MailSender, create_app
 from flask_mailing import Mail, Message
 
 import os as os
 
 
+MAIL_RECIPIENT = os.environ['MAIL_RECIPIENT']
+
 mail = Mail()
 
 
@@ -18,6 +20,10 @@ mail.init_app(app)
 
 app = create_app()
 mail.init_app(app)
+sender = MailSender(mail)
+
+# load and compile the template once instead of on every request
+test_template = app.jinja_env.get_template("test.html")
 
 @app.get('/')
 def index():
@@ -25,15 +31,15 @@ def index():
 
 @app.get('/send-mail')
 async def send_mail():
-    await mail.send_mail('subject', "message-new", [os.environ['MAIL_RECIPIENT']])
+    async with mail.connection() as conn:
+        await mail.send_mail('subject', "message-new", [MAIL_RECIPIENT], connection=conn)
     return {'msg' : 'success'}
 
 @app.get('/send-mass-mail')
 async def send_mass_mail():
     datatuple = (
-        ('subject-1', 'body-1', [os.environ['MAIL_RECIPIENT']]),
-        ('subject-2', 'body-2', [os.environ['MAIL_RECIPIENT']]),
-        ('subject-3', 'body-3', [os.environ['MAIL_RECIPIENT']]),
+        (f'subject-{i}', f'body-{i}', [MAIL_RECIPIENT])
+        for i in range(1, 4)
     )
     await mail.send_mass_mail(datatuple)
     return {'msg' : 'success'}
@@ -42,38 +48,34 @@ async def send_mass_mail():
 @app.get("/email")
 async def simple_send() -> jsonify:
 
-    message = Message(
-        subject="Flask-Mailing module",
-        recipients=[os.environ['MAIL_RECIPIENT']],
-        body="This is the basic email body",
+    message = Message.simple(
+        "Flask-Mailing module", MAIL_RECIPIENT, "This is the basic email body"
         )
     # message.add_recipient("aniforsana@gmail.com")
 
     
-    await mail.send_message(message)
-    return jsonify(status_code=200, content={"message": "email has been sent"})
+    sender.put(message)
+    return jsonify(status_code=202, content={"message": "email has been queued"}), 202
 
 
 @app.get("/mail-file")
 async def mail_file():
     message = Message(
         subject = "attachments based email",
-        recipients = [os.environ['MAIL_RECIPIENT']],
+        recipients = [MAIL_RECIPIENT],
         body = "This is the email body",
-        attachments = ['attachments/attachment.txt']
+        attachments = ['attachments/attachment.txt', 'attachments/test.html']
     )
-    with app.open_resource('attachments/test.html') as fp:
-        message.attach("test.html", fp.read())
 
-    await mail.send_message(message)
-    return jsonify(message="email sent")
+    sender.put(message)
+    return jsonify(message="email queued"), 202
 
 @app.get("/mail-html")
 async def mail_html():
     Message.update_forward_refs()
     message = Message(
         subject = "html template based email",
-        recipients = [os.environ['MAIL_RECIPIENT']],
+        recipients = [MAIL_RECIPIENT],
         template_params = {
                         "first_name": "Fred",
                         "last_name": "Fredsson"
@@ -84,8 +86,8 @@ async def mail_html():
                         }
         # attachments = ['attachments/attachment.txt']
     )
-    await mail.send_message(message, template_name="test.html")
-    return jsonify(message="email sent")
+    sender.put(message, template_name=test_template)
+    return jsonify(message="email queued"), 202
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
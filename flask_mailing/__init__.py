@@ -85,13 +85,30 @@ For more examples of using flask-mailing please check [example](https://marktenn
 """
 
 
-from . import utils
+import importlib
+import typing as t
+
 from .config import ConnectionConfig
 from .mail import Mail
 from .schemas import Message as Message
 from .schemas import MultipartSubtypeEnum as MultipartSubtypeEnum
 
+if t.TYPE_CHECKING:
+    from . import utils
+
 __author__ = "aniketsarkar@yahoo.com"
 
 
 __all__ = ["Mail", "ConnectionConfig", "Message", "utils", "MultipartSubtypeEnum"]
+
+
+def __getattr__(name: str):
+    # `utils` pulls in dnspython and the optional redis/httpx clients,
+    # so it is only imported once it's actually used.
+    if name == "utils":
+        return importlib.import_module(".utils", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | {"utils"})
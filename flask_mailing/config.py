@@ -3,14 +3,18 @@ from pathlib import Path
 from typing import Optional
 
 from flask.globals import current_app
-from jinja2 import Environment, FileSystemLoader
-from pydantic import DirectoryPath, EmailStr, conint, field_validator
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from pydantic import DirectoryPath, PrivateAttr, conint, field_validator
 from pydantic_settings import BaseSettings as Settings
 
 from .errors import TemplateFolderDoesNotExist
+from .schemas import EmailAddress
 
 
 class ConnectionConfig(Settings):
+    # checked by `Connection` instead of an isinstance test
+    __is_connection_config__ = True
+
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_PORT: int = 465
@@ -18,12 +22,36 @@ class ConnectionConfig(Settings):
     MAIL_USE_TLS: bool = False
     MAIL_USE_SSL: bool = True
     MAIL_DEBUG: conint(gt=-1, lt=2) = 0
-    MAIL_FROM: EmailStr
+    MAIL_FROM: EmailAddress
     MAIL_FROM_NAME: Optional[str] = None
     MAIL_TEMPLATE_FOLDER: Optional[DirectoryPath] = None
+    MAIL_TEMPLATE_CACHE_DIR: Optional[str] = None
     SUPPRESS_SEND: conint(gt=-1, lt=2) = 0
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: conint(gt=0) = 5
+    MAIL_POOL_MAX_MESSAGES: conint(gt=0) = 100
+    MAIL_POOL_IDLE_TIMEOUT: conint(gt=0) = 60
+
+    _template_env: Optional[Environment] = PrivateAttr(default=None)
+
+    @property
+    def smtp_kwargs(self) -> dict:
+        """Keyword arguments for `aiosmtplib.SMTP`."""
+        return {
+            "hostname": self.MAIL_SERVER,
+            "port": self.MAIL_PORT,
+            "use_tls": self.MAIL_USE_SSL,
+            "start_tls": self.MAIL_USE_TLS,
+            "validate_certs": self.VALIDATE_CERTS,
+        }
+
+    @property
+    def sender(self) -> str:
+        """The From header value."""
+        if self.MAIL_FROM_NAME is not None:
+            return f"{self.MAIL_FROM_NAME} <{self.MAIL_FROM}>"
+        return self.MAIL_FROM
 
     @field_validator("MAIL_TEMPLATE_FOLDER")
     def template_folder_validator(cls, v):
@@ -38,22 +66,32 @@ class ConnectionConfig(Settings):
 
     def template_engine(self) -> Environment:
         """Return template environment."""
+        if self._template_env is not None:
+            return self._template_env
+
         folder = self.MAIL_TEMPLATE_FOLDER
 
         if not folder:
-            template_env = current_app.jinja_env
-
+            # bound on first use, the app's jinja options are final by then
+            self._template_env = current_app._get_current_object().jinja_env
         else:
-            template_env: "Environment" = Environment(loader=FileSystemLoader(folder))
+            # built once, so compiled templates stay in the environment cache
+            # compiled templates are kept on disk too, so a new worker
+            # process doesn't parse and compile them again
+            self._template_env = Environment(
+                loader=FileSystemLoader(folder),
+                bytecode_cache=FileSystemBytecodeCache(self.MAIL_TEMPLATE_CACHE_DIR),
+                cache_size=400,
+                auto_reload=False,
+            )
+
+        return self._template_env
+
 
-        return template_env
+_BASE_REAL = os.path.realpath(os.path.dirname(os.path.dirname(__file__)))
 
 
 def path_traversal(fp: Path) -> bool:
     """Check for path traversal vulnerabilities."""
-    base = Path(__file__).parent.parent
-    try:
-        base.joinpath(fp).resolve().relative_to(base.resolve())
-    except ValueError:
-        return False
-    return True
+    requested = os.path.realpath(os.path.join(_BASE_REAL, os.fspath(fp)))
+    return os.path.commonpath((_BASE_REAL, requested)) == _BASE_REAL
@@ -1,53 +1,245 @@
-import aiosmtplib
-from pydantic_settings import BaseSettings as Settings
+import asyncio
+import threading
+import typing as t
+import weakref
+from contextlib import asynccontextmanager
 
 from .config import ConnectionConfig
 from .errors import ConnectionErrors, PydanticClassRequired
 
+if t.TYPE_CHECKING:
+    import aiosmtplib
+
+
+# seconds to wait for the reply when probing an idle session
+NOOP_TIMEOUT = 5
+
+
+class _NullSMTP:
+    """Stands in for `aiosmtplib.SMTP` while `SUPPRESS_SEND` is set."""
+
+    is_connected = True
+
+    async def send_message(self, *args, **kwargs):
+        return {}, "OK"
+
+    async def noop(self, *args, **kwargs):
+        return None
+
+    async def quit(self, *args, **kwargs):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
 
 class Connection:
     """
     Manages Connection to provided email service with its credentials
     """
 
+    session: "aiosmtplib.SMTP"
+
     def __init__(self, settings: ConnectionConfig):
-        if not issubclass(settings.__class__, Settings):
+        if not getattr(settings, "__is_connection_config__", False):
             raise PydanticClassRequired(
                 """Email configuruation should be provided from ConnectionConfig class, check example below:
          \nfrom flask_mailing import ConnectionConfig  \nconf = Connection(\nMAIL_USERNAME = "your_username",\nMAIL_PASSWORD = "your_pass",\nMAIL_FROM = "your_from_email",\nMAIL_PORT = 587,\nMAIL_SERVER = "email_service",\nMAIL_TLS = True,\nMAIL_SSL = False)
          """
             )
 
-        self.settings = settings.model_dump()
+        # kept as the config object, fields are read as plain attributes
+        self.settings = settings
+        self.messages_sent = 0
+        self.last_used = 0.0
 
     async def __aenter__(self):  # setting up a connection
         await self._configure_connection()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):  # closing the connection
-        if not self.settings.get("SUPPRESS_SEND"):  # for test environ
+        await self.session.quit()
+
+    async def send_message(self, message) -> None:
+        """
+        Send an already built email message over this session, the session
+        is reopened once it has carried `MAIL_POOL_MAX_MESSAGES` messages.
+        """
+        if self.messages_sent >= self.settings.MAIL_POOL_MAX_MESSAGES:
+            await self._reconnect()
+        await self.session.send_message(message)
+        self.messages_sent += 1
+
+    async def send_many(self, messages) -> None:
+        """Send several already built email messages over this session."""
+        for message in messages:
+            await self.send_message(message)
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether the underlying SMTP session still has an open transport."""
+        return self.session.is_connected
+
+    async def is_alive(self) -> bool:
+        """
+        Probe the session with a `NOOP` command. A dropped transport, a
+        421 reply or no reply within `NOOP_TIMEOUT` seconds means it is gone.
+        """
+        if not self.session.is_connected:
+            return False
+        from aiosmtplib import SMTPException
+
+        try:
+            await self.session.noop(timeout=NOOP_TIMEOUT)
+        except SMTPException:
+            return False
+        return True
+
+    async def close(self) -> None:
+        """Close the session, quietly dropping an already broken one."""
+        from aiosmtplib import SMTPException
+
+        try:
             await self.session.quit()
+        except SMTPException:
+            self.session.close()
+
+    async def _reconnect(self) -> None:
+        await self.close()
+        await self._configure_connection()
+        self.messages_sent = 0
 
     async def _configure_connection(self):
-        try:
-            self.session = aiosmtplib.SMTP(
-                hostname=self.settings.get("MAIL_SERVER"),
-                port=self.settings.get("MAIL_PORT"),
-                use_tls=self.settings.get("MAIL_USE_SSL"),
-                start_tls=self.settings.get("MAIL_USE_TLS"),
-                validate_certs=self.settings.get("VALIDATE_CERTS"),
-            )
+        if self.settings.SUPPRESS_SEND:  # for test environ
+            self.session = _NullSMTP()
+            return
+
+        # imported on first use, apps that rarely send mail don't pay for it
+        import aiosmtplib
 
-            if not self.settings.get("SUPPRESS_SEND"):  # for test environ
-                await self.session.connect()
+        try:
+            self.session = aiosmtplib.SMTP(**self.settings.smtp_kwargs)
+            await self.session.connect()
 
-                if self.settings.get("USE_CREDENTIALS"):
-                    await self.session.login(
-                        self.settings.get("MAIL_USERNAME"),
-                        self.settings.get("MAIL_PASSWORD"),
-                    )
+            if self.settings.USE_CREDENTIALS:
+                await self.session.login(
+                    self.settings.MAIL_USERNAME,
+                    self.settings.MAIL_PASSWORD,
+                )
 
         except Exception as error:
             raise ConnectionErrors(
                 f"Exception raised {error}, check your credentials or email service configuration"
-            )
+            ) from error
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` logged in connections ready to be shared by concurrent
+    senders. A connection is closed and replaced after `max_messages`
+    messages or when it stayed idle for more than `idle_timeout` seconds.
+
+    Flask runs every async view inside its own event loop, on its own
+    thread, and connections can't be used from another loop. Each loop
+    gets its own connections, they are closed when `asyncio.run()` shuts
+    the loop down.
+    """
+
+    def __init__(
+        self,
+        settings: ConnectionConfig,
+        size: int = 5,
+        max_messages: int = 100,
+        idle_timeout: float = 60,
+    ):
+        self.settings = settings
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        # loop -> (queue of idle connections, its shutdown hook)
+        self._queues = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def _get_queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._queues.get(loop)
+            if entry is not None:
+                return entry[0]
+            queue = asyncio.LifoQueue(maxsize=self.size)
+            for _ in range(self.size):
+                queue.put_nowait(None)
+            hook = self._close_on_shutdown(loop, queue)
+            self._queues[loop] = (queue, hook)
+        # started here so the loop tracks it, `shutdown_asyncgens()` closes it
+        await hook.__anext__()
+        return queue
+
+    async def _close_on_shutdown(self, loop, queue: asyncio.Queue):
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._queues.pop(loop, None)
+            await self._close_idle(queue)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Borrow a connection from the pool, it is given back on exit.
+
+        ### For example =>
+        ```python
+        async with pool.acquire() as conn:
+            await conn.send_message(msg)
+        ```
+        """
+        queue = await self._get_queue()
+        conn = await queue.get()
+        try:
+            conn = await self._checkout(conn)
+            yield conn
+        except BaseException:
+            await self._discard(conn)
+            conn = None
+            raise
+        finally:
+            queue.put_nowait(await self._checkin(conn))
+
+    async def close(self) -> None:
+        """Close every idle connection the pool keeps for the running loop."""
+        with self._lock:
+            entry = self._queues.get(asyncio.get_running_loop())
+        if entry is not None:
+            await self._close_idle(entry[0])
+
+    async def _close_idle(self, queue: asyncio.Queue) -> None:
+        for _ in range(queue.qsize()):
+            conn = queue.get_nowait()
+            await self._discard(conn)
+            queue.put_nowait(None)
+
+    async def _checkout(self, conn):
+        if conn is not None:
+            idle = asyncio.get_running_loop().time() - conn.last_used
+            if idle > self.idle_timeout or not await conn.is_alive():
+                await self._discard(conn)
+                conn = None
+        if conn is None:
+            conn = Connection(self.settings)
+            await conn._configure_connection()
+        return conn
+
+    async def _checkin(self, conn):
+        if conn is None:
+            return None
+        if not conn.is_connected or conn.messages_sent >= self.max_messages:
+            await self._discard(conn)
+            return None
+        conn.last_used = asyncio.get_running_loop().time()
+        return conn
+
+    @staticmethod
+    async def _discard(conn) -> None:
+        if conn is not None:
+            await conn.close()
@@ -1,11 +1,14 @@
+import asyncio
+import os
 import typing as t
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 import blinker
+from jinja2 import Template
 from pydantic import BaseModel, EmailStr
 
 from .config import ConnectionConfig
-from .connection import Connection
+from .connection import Connection, ConnectionPool
 from .errors import PydanticClassRequired
 from .msg import MailMsg
 from .schemas import Message
@@ -18,7 +21,7 @@ version_info = (0, 2, 3)
 
 class _MailMixin:
     name = "Flask Mailing"
-    version = ".".join([str(v) for v in version_info])
+    version = ".".join(map(str, version_info))
 
     @contextmanager
     def record_messages(self):
@@ -71,59 +74,136 @@ class Mail(_MailMixin):
             MAIL_DEBUG=app.config.get("MAIL_DEBUG", 0),
             MAIL_FROM_NAME=app.config.get("MAIL_FROM_NAME", None),
             MAIL_TEMPLATE_FOLDER=app.config.get("MAIL_TEMPLATE_FOLDER", None),
+            MAIL_TEMPLATE_CACHE_DIR=app.config.get(
+                "MAIL_TEMPLATE_CACHE_DIR",
+                os.environ.get("FLASK_MAILING_TEMPLATE_CACHE_DIR"),
+            ),
             SUPPRESS_SEND=app.config.get("SUPPRESS_SEND", 0),
             USE_CREDENTIALS=app.config.get("USE_CREDENTIALS", True),
             VALIDATE_CERTS=app.config.get("VALIDATE_CERTS", True),
+            MAIL_POOL_SIZE=app.config.get("MAIL_POOL_SIZE", 5),
+            MAIL_POOL_MAX_MESSAGES=app.config.get("MAIL_POOL_MAX_MESSAGES", 100),
+            MAIL_POOL_IDLE_TIMEOUT=app.config.get("MAIL_POOL_IDLE_TIMEOUT", 60),
             MAIL_FROM=app.config.get(
                 "MAIL_FROM",
                 app.config.get("MAIL_DEFAULT_SENDER", app.config.get("MAIL_USERNAME")),
             ),
         )
+        self.pool = ConnectionPool(
+            self.config,
+            size=self.config.MAIL_POOL_SIZE,
+            max_messages=self.config.MAIL_POOL_MAX_MESSAGES,
+            idle_timeout=self.config.MAIL_POOL_IDLE_TIMEOUT,
+        )
+        self._templates: t.Dict[str, Template] = {}
         app.extensions["mailing"] = self
 
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Open a single SMTP session which can be shared by several
+        `send_message` calls, so the TCP, TLS and AUTH handshakes happen
+        only once.
+
+        ### For example =>
+        ```python
+        async with mail.connection() as conn:
+            for message in messages:
+                await mail.send_message(message, connection=conn)
+        ```
+        """
+        async with Connection(self.config) as conn:
+            yield conn
+
+    def acquire(self):
+        """
+        Borrow an already opened SMTP session from the connection pool,
+        concurrent views get their own warm session instead of
+        opening a new one for every message.
+
+        ### For example =>
+        ```python
+        async with mail.acquire() as conn:
+            await mail.send_message(message, connection=conn)
+        ```
+        """
+        return self.pool.acquire()
+
     async def get_mail_template(self, env_path, template_name):
         return env_path.get_template(template_name)
 
+    def _get_template(self, template_name: str) -> Template:
+        template = self._templates.get(template_name)
+        if template is None:
+            env = self.config.template_engine()
+            template = env.get_template(template_name)
+            # with auto_reload the environment has to check the source again
+            if not env.auto_reload:
+                self._templates[template_name] = template
+        return template
+
     @staticmethod
     def make_dict(data):
+        if isinstance(data, dict):
+            return data
+        if isinstance(data, BaseModel):
+            return data.__dict__
         try:
             return dict(data)
-        except ValueError:
+        except (TypeError, ValueError) as error:
             raise ValueError(
                 f"Unable to build template data dictionary - {type(data)} is an invalid source data type"
-            )
+            ) from error
+
+    def _render_template(self, template: Template, template_body) -> str:
+        if isinstance(template_body, list):
+            return template.render({"body": template_body})
+        return template.render(**self.make_dict(template_body))
+
+    def _resolve_template(self, template_name) -> t.Optional[Template]:
+        if isinstance(template_name, Template):
+            return template_name
+        if template_name:
+            return self._get_template(template_name)
+        return None
 
-    async def __prepare_message(self, message: Message, template=None):
+    async def __prepare_message(self, message: Message, template=None, render=None):
         if template is not None:
+            render = render or self._render_template
             template_body = message.template_body
             if template_body and not message.html:
-                if isinstance(template_body, list):
-                    message.template_body = template.render({"body": template_body})
-                else:
-                    template_data = self.make_dict(template_body)
-                    message.template_body = template.render(**template_data)
-
+                message.template_body = render(template, template_body)
                 message.subtype = "html"
             elif message.html:
-                if isinstance(template_body, list):
-                    message.template_body = template.render({"body": template_body})
-                else:
-                    template_data = self.make_dict(template_body)
-                    message.template_body = template.render(**template_data)
-        msg = MailMsg(**message.model_dump())
-        if self.config.MAIL_FROM_NAME is not None:
-            sender = f"{self.config.MAIL_FROM_NAME} <{self.config.MAIL_FROM}>"
-        else:
-            sender = self.config.MAIL_FROM
-        return await msg._message(sender)
+                message.template_body = render(template, template_body)
+        # the message is already validated, a shallow copy of its fields is enough
+        msg = MailMsg(**dict(message))
+        return await msg._message(self.config.sender)
+
+    @staticmethod
+    def _check_message(message) -> None:
+        if not isinstance(message, Message):
+            raise PydanticClassRequired(
+                """Message schema should be provided from Message class, check example below:
+         \nfrom flask_mailing import Message  \nmessage = Message(\nsubject = "subject",\nrecipients = ["list_of_recipients"],\nbody = "Hello World",\ncc = ["list_of_recipients"],\nbcc = ["list_of_recipients"],\nreply_to = ["list_of_recipients"],\nsubtype = "plain")
+         """
+            )
 
-    async def send_message(self, message: Message, template_name=None):
+    async def send_message(
+        self,
+        message: Message,
+        template_name=None,
+        connection: t.Optional[Connection] = None,
+    ):
         """
         to send the message object.
 
         :param `message`: The object of the Message pydantic class.
         :param `template_name`: if you are about to render any template
         with the mail please provide the name of the template by using this param.
+        An already loaded `jinja2.Template` object is accepted as well.
+        :param `connection`: an already opened connection from `Mail.connection`,
+        if not provided a new SMTP session is opened for this message only.
 
         ### For example =>
         ```python
@@ -138,25 +218,21 @@ class Mail(_MailMixin):
             return jsonify(status_code=200, content={"message": "email has been sent"})
         ```
         """
-        if not issubclass(message.__class__, BaseModel):
-            raise PydanticClassRequired(
-                """Message schema should be provided from Message class, check example below:
-         \nfrom flask_mailing import Message  \nmessage = Message(\nsubject = "subject",\nrecipients = ["list_of_recipients"],\nbody = "Hello World",\ncc = ["list_of_recipients"],\nbcc = ["list_of_recipients"],\nreply_to = ["list_of_recipients"],\nsubtype = "plain")
-         """
-            )
+        self._check_message(message)
+        msg = await self.__prepare_message(
+            message, self._resolve_template(template_name)
+        )
 
-        if template_name:
-            template = await self.get_mail_template(
-                self.config.template_engine(), template_name
-            )
-            msg = await self.__prepare_message(message, template)
+        if connection is None:
+            async with self.connection() as connection:
+                await self._send(connection, msg)
         else:
-            msg = await self.__prepare_message(message)
-
-        async with Connection(self.config) as session:
-            if not self.config.SUPPRESS_SEND:
-                await session.session.send_message(msg)
+            await self._send(connection, msg)
 
+    async def _send(self, connection: Connection, msg) -> None:
+        await connection.send_message(msg)
+        # skip blinker's receiver lookup when nobody is listening
+        if email_dispatched.receivers:
             email_dispatched.send(msg)
 
     async def send_mail(
@@ -165,6 +241,7 @@ class Mail(_MailMixin):
         message: str,
         recipients: t.List[EmailStr],
         html_message: t.Optional[str] = None,
+        connection: t.Optional[Connection] = None,
         **msgkwargs,
     ) -> None:
         """
@@ -175,6 +252,7 @@ class Mail(_MailMixin):
         :param `recipients`: A list of strings, each an email address.
         Each member of recipients will see the other recipients
         in the “To:” field of the email message
+        :param `connection`: an already opened connection from `Mail.connection`.
         :param `msgkwargs` : the kwargs based parameters for `Message` class.
 
         ### For example =>
@@ -185,28 +263,153 @@ class Mail(_MailMixin):
             return {'msg' : 'success'}
         ```
         """
-        message = Message(
+        message = self._make_message(
+            subject, message, recipients, html_message, **msgkwargs
+        )
+        await self.send_message(message, connection=connection)
+
+    @staticmethod
+    def _make_message(
+        subject: str,
+        message: str,
+        recipients: t.List[EmailStr],
+        html_message: t.Optional[str] = None,
+        **msgkwargs,
+    ) -> Message:
+        return Message(
             subject=subject,
             recipients=recipients,
             body=message,
             html=html_message,
             **msgkwargs,
         )
-        await self.send_message(message)
+
+    async def send_bulk(
+        self, messages: t.Iterable[Message], template_name=None, concurrency: int = 1
+    ) -> None:
+        """
+        Send many `Message` objects, by default over a single SMTP session.
+
+        :param `messages`: an iterable (a list or generator) of `Message` objects.
+        :param `template_name`: same as for `send_message`, used for every message.
+        Consecutive messages with an equal `template_body` share one rendering.
+        :param `concurrency`: number of SMTP sessions sending in parallel,
+        borrowed from the connection pool so capped by `MAIL_POOL_SIZE`.
+        A session is only borrowed when there is a message left for it.
+
+        ### For example =>
+        ```python
+        @app.get("/newsletter")
+        async def newsletter():
+            await mail.send_bulk(
+                Message(subject="news", recipients=[user.email], body="...")
+                for user in users
+            )
+            return jsonify(message="newsletter has been sent")
+        ```
+        """
+        # one shared iterator, every worker pulls the next pending message
+        messages = iter(messages)
+        concurrency = max(1, min(concurrency, self.config.MAIL_POOL_SIZE))
+        template = self._resolve_template(template_name)
+        last_rendered = None
+
+        def render(template: Template, template_body) -> str:
+            # campaigns usually share one template_body, render it only once
+            nonlocal last_rendered
+            if last_rendered is None or last_rendered[0] != template_body:
+                rendered = self._render_template(template, template_body)
+                last_rendered = (template_body, rendered)
+            return last_rendered[1]
+
+        async def send(connection: Connection, message: Message):
+            self._check_message(message)
+            msg = await self.__prepare_message(message, template, render)
+            await self._send(connection, msg)
+
+        async def worker():
+            message = next(messages, None)
+            if message is None:
+                return
+            async with self.pool.acquire() as connection:
+                await send(connection, message)
+                for message in messages:
+                    await send(connection, message)
+
+        tasks = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # a failed message stops the other workers, their sessions close
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def send_mass_mail(
-        self, datatuple: t.Tuple[t.Tuple[str, str, t.List[EmailStr]]]
+        self,
+        datatuple: t.Iterable[t.Tuple[str, str, t.List[EmailStr]]],
+        concurrency: int = 1,
     ):
         """
         To handle mass mailing.
 
-        :param `datatuple`: is a tuple in which each element is in this format:
+        :param `datatuple`: is an iterable (a tuple, list or generator)
+        in which each element is in this format:
         ```bash
         (subject, message, recipients)
         ```
+        A generator lets large batches be sent without building them in memory first.
+        :param `concurrency`: number of SMTP sessions sending in parallel,
+        borrowed from the connection pool so capped by `MAIL_POOL_SIZE`.
+        By default all the messages are sent over a single SMTP session.
+
+        The next messages are built while the previous ones are being transmitted.
         """
-        for data in datatuple:
-            await self.send_mail(*data)
+        # The MAIL/RCPT/DATA commands of a message are not pipelined
+        # (RFC 2920): aiosmtplib reads exactly one reply per command and
+        # drops replies that arrive early, so reusing the session is the
+        # round trip saving available here.
+        concurrency = max(1, min(concurrency, self.config.MAIL_POOL_SIZE))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+
+        # bound once, these are looked up for every message of the batch
+        prepare, make_message = self.__prepare_message, self._make_message
+        send, put, get = self._send, queue.put, queue.get
+
+        async def produce():
+            try:
+                for data in datatuple:
+                    await put(await prepare(make_message(*data)))
+            except Exception as error:
+                await queue.put(error)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def next_message():
+            msg = await get()
+            if isinstance(msg, Exception):
+                raise msg
+            return msg
+
+        async def consume():
+            # a session is only borrowed once there is a message for it
+            msg = await next_message()
+            if msg is None:
+                return
+            async with self.pool.acquire() as connection:
+                while msg is not None:
+                    await send(connection, msg)
+                    msg = await next_message()
+
+        tasks = [asyncio.ensure_future(produce())]
+        tasks += [asyncio.ensure_future(consume()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # let the cancelled senders close their sessions
+            await asyncio.gather(*tasks, return_exceptions=True)
 
 
 signals = blinker.Namespace()
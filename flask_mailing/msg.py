@@ -1,18 +1,107 @@
+import asyncio
+import socket
 import sys
 import time
 import typing as t
 import warnings
-from email.encoders import encode_base64
+from base64 import encodebytes
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
 from email.mime.text import MIMEText
 from email.utils import formatdate, make_msgid
+from functools import lru_cache
+
+from .errors import WrongFile
+from .schemas import AttachmentRef
 
 if t.TYPE_CHECKING:
     from werkzeug.datastructures import FileStorage
 
 PY3 = sys.version_info[0] == 3
 
+# multiple of 57 bytes, the input of one full 76 characters base64 line
+CHUNK_SIZE = 57 * 1024
+
+
+@lru_cache(maxsize=1)
+def _fqdn() -> str:
+    # make_msgid() calls socket.getfqdn() every time unless a domain is given,
+    # resolved on first use so importing the module does no dns lookup
+    return socket.getfqdn()
+
+
+# (second, formatted Date header), messages built in the same second share it
+_date_cache = (0, "")
+
+
+def format_date() -> str:
+    """Current local time as a Date header value, formatted once per second."""
+    global _date_cache
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache = (now, formatdate(now, localtime=True))
+    return _date_cache[1]
+
+
+@lru_cache(maxsize=1)
+def _warn_body_template() -> None:
+    # emitted once per process, warnings.warn is costly on every send
+    warnings.warn(
+        "Use ``template_body`` instead of ``body`` to pass data into Jinja2 template",
+        DeprecationWarning,
+    )
+
+
+@lru_cache(maxsize=None)
+def _ascii_compatible(charset: str) -> bool:
+    try:
+        return _ASCII_SAMPLE.encode(charset) == _ASCII_SAMPLE.encode("ascii")
+    except LookupError:
+        return False
+
+
+_ASCII_SAMPLE = "".join(map(chr, range(128)))
+
+
+def is_7bit(text: str, charset: str = "utf-8") -> bool:
+    """
+    Whether `text` can be sent as is under `charset`, ascii with lines of at
+    most 998 characters and a charset which encodes ascii unchanged.
+    """
+    return (
+        text.isascii()
+        and _ascii_compatible(charset)
+        and all(len(line) <= 998 for line in text.splitlines())
+    )
+
+
+def make_7bit_text(text: str, subtype: str, charset: str) -> MIMENonMultipart:
+    """
+    Build a text part for an ascii body without running it through the
+    charset's body encoder, the payload is sent as 7bit.
+    """
+    # MIMEText would re-parse the Content-Type parameters in set_charset(),
+    # the headers it ends up with are set directly here
+    part = MIMENonMultipart("text", subtype, charset=charset)
+    part["Content-Transfer-Encoding"] = "7bit"
+    part.set_payload(text)
+    return part
+
+
+def encode_base64_stream(fp) -> str:
+    """Base64 encode a binary file object chunk by chunk."""
+    encoded = bytearray()
+    for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+        encoded += encodebytes(chunk)
+    return encoded.decode("ascii")
+
+
+def encode_file_base64(path: str) -> str:
+    """Read a file from the disk and base64 encode it."""
+    with open(path, mode="rb") as fp:
+        return encode_base64_stream(fp)
+
 
 class MailMsg:
     """
@@ -37,14 +126,18 @@ class MailMsg:
 
     def __init__(self, **entries):
         self.__dict__.update(entries)
-        self.msgId = make_msgid()
+        self.msgId = make_msgid(domain=_fqdn())
 
     def _mimetext(self, text, subtype="plain"):
         """Creates a MIMEText object"""
 
+        if is_7bit(text, self.charset):
+            return make_7bit_text(text, subtype, self.charset)
         return MIMEText(text, _subtype=subtype, _charset=self.charset)
 
-    async def attach_file(self, message, attachment: t.List["FileStorage"]):
+    async def attach_file(
+        self, message, attachment: t.List[t.Union["FileStorage", AttachmentRef]]
+    ):
         """Creates a MIMEBase object"""
         for file, file_meta in attachment:
             if file_meta and "mime_type" in file_meta and "mime_subtype" in file_meta:
@@ -54,8 +147,25 @@ class MailMsg:
             else:
                 part = MIMEBase(_maintype="application", _subtype="octet-stream")
 
-            part.set_payload(file.read())
-            encode_base64(part)
+            if isinstance(file, AttachmentRef):
+                # disk reads would block the event loop, run them in a thread
+                try:
+                    payload = await asyncio.get_running_loop().run_in_executor(
+                        None, encode_file_base64, file.path
+                    )
+                except OSError as error:
+                    raise WrongFile(
+                        f"attachment {file.path!r} can't be read: {error}"
+                    ) from error
+                part.set_payload(payload)
+            else:
+                # message copies and retries share the stream, read it from the start
+                try:
+                    file.stream.seek(0)
+                except (AttributeError, OSError):  # not seekable, read as is
+                    pass
+                part.set_payload(encode_base64_stream(file))
+            part["Content-Transfer-Encoding"] = "base64"
 
             filename = file.filename
 
@@ -79,7 +189,7 @@ class MailMsg:
         self.message = MIMEMultipart(self.multipart_subtype.value)
 
         self.message.set_charset(self.charset)
-        self.message["Date"] = formatdate(time.time(), localtime=True)
+        self.message["Date"] = format_date()
         self.message["Message-ID"] = self.msgId
         self.message["To"] = ", ".join(self.recipients)
         self.message["From"] = sender
@@ -102,10 +212,7 @@ class MailMsg:
         if self.template_body or self.body:
             if not self.html and self.subtype == "html":
                 if self.body:
-                    warnings.warn(
-                        "Use ``template_body`` instead of ``body`` to pass data into Jinja2 template",
-                        DeprecationWarning,
-                    )
+                    _warn_body_template()
                 self.message.attach(
                     self._mimetext(self.template_body or self.body, self.subtype)
                 )
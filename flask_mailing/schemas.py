@@ -1,20 +1,65 @@
 import io
 import os
+import re
+import stat
 import sys
 from enum import Enum
+from functools import lru_cache
 from mimetypes import MimeTypes
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 if sys.version_info >= (3, 8):
     from typing import Literal
 else:
     from typing_extensions import Literal
 
-from pydantic import BaseModel, EmailStr, field_validator
+if sys.version_info >= (3, 9):
+    from typing import Annotated
+else:
+    from typing_extensions import Annotated
+
+import email_validator
+from pydantic import AfterValidator, BaseModel, ConfigDict, field_validator
+from pydantic.networks import validate_email
 from werkzeug.datastructures import FileStorage
 
 from .errors import WrongFile
 
+_MIME = MimeTypes()
+
+_ATEXT = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+"
+_LABEL = r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+# plain ascii addresses, anything else goes through email-validator
+_EMAIL_RE = re.compile(
+    rf"(?P<local>{_ATEXT}(?:\.{_ATEXT})*)@(?P<domain>(?:{_LABEL}\.)+[A-Za-z]{{2,63}})",
+    re.ASCII,
+)
+
+
+def validate_email_address(value: str) -> str:
+    """
+    Validate and normalize an email address like `EmailStr` does, common
+    ascii addresses are checked by a precompiled regex instead of the
+    slower email-validator parser.
+    """
+    match = _EMAIL_RE.fullmatch(value)
+    if match is not None and len(value) <= 254 and len(match["local"]) <= 64:
+        domain = match["domain"].lower()
+        if "xn--" not in domain and not any(
+            domain == name or domain.endswith("." + name)
+            for name in email_validator.SPECIAL_USE_DOMAIN_NAMES
+        ):
+            return f"{match['local']}@{domain}"
+    return _validate_email(value)
+
+
+@lru_cache(maxsize=4096)
+def _validate_email(value: str) -> str:
+    return validate_email(value)[1]
+
+
+EmailAddress = Annotated[str, AfterValidator(validate_email_address)]
+
 
 class MultipartSubtypeEnum(Enum):
     """
@@ -33,21 +78,81 @@ class MultipartSubtypeEnum(Enum):
     byterange = "byterange"
 
 
+class AttachmentRef:
+    """
+    Attachment given as a path on the disk, the file is only opened
+    and streamed while the email is being built.
+
+    :param path: path of the file.
+    :param content_type: mime type of the file.
+    """
+
+    __slots__ = ("path", "filename", "content_type")
+
+    def __init__(self, path: str, content_type: Optional[str] = None):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.content_type = content_type
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+
 class Message(BaseModel):
-    recipients: List[EmailStr]
-    attachments: List[Union[FileStorage, Dict, str]] = []
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    recipients: List[EmailAddress]
+    attachments: List[Union[FileStorage, Dict, str, Tuple[str, bytes]]] = []
     subject: str = ""
     body: Optional[Union[str, list]] = None
     template_body: Optional[Union[list, dict]] = None
     template_params: Optional[Union[list, dict]] = None
     html: Optional[Union[str, List, Dict]] = None
-    cc: List[EmailStr] = []
-    bcc: List[EmailStr] = []
-    reply_to: List[EmailStr] = []
+    cc: List[EmailAddress] = []
+    bcc: List[EmailAddress] = []
+    reply_to: List[EmailAddress] = []
     charset: str = "utf-8"
     subtype: Optional[str] = None
     multipart_subtype: MultipartSubtypeEnum = MultipartSubtypeEnum.mixed
 
+    @classmethod
+    def simple(cls, subject: str, recipient: str, body: str) -> "Message":
+        """
+        Build a plain text message for a single recipient without running
+        the full model validation, only the recipient address is checked.
+
+        :param `subject`: subject of the message.
+        :param `recipient`: email address of the recipient.
+        :param `body`: plain text body of the message.
+
+        ### For example =>
+        ```python
+        message = Message.simple("subject", "recipient@email.com", "body")
+        ```
+        """
+        return cls.model_construct(
+            subject=subject,
+            recipients=[validate_email_address(recipient)],
+            body=body,
+        )
+
+    @classmethod
+    def fast(cls, **data) -> "Message":
+        """
+        Build a message from already validated data without running any
+        validator, e.g. the fields of another `Message`. Nothing is checked,
+        attachments must already be in their validated `(file, meta)` form.
+        The copies share the attachments, their streams are read again from
+        the start for every message sent.
+
+        ### For example =>
+        ```python
+        for recipient in recipients:
+            copy = Message.fast(**{**dict(message), "recipients": [recipient]})
+        ```
+        """
+        return cls.model_construct(**data)
+
     @field_validator("template_params")
     def validate_template_params(cls, value, info):
         if info.data.get("template_body", None) is None:
@@ -64,37 +169,36 @@ class Message(BaseModel):
     @field_validator("attachments")
     def validate_file(cls, v):
         temp = []
-        mime = MimeTypes()
 
         for file in v:
             file_meta = None
             if isinstance(file, dict):
-                keys = file.keys()
-                if "file" not in keys:
+                if "file" not in file:
                     raise WrongFile('missing "file" key')
-                file_meta = dict.copy(file)
-                del file_meta["file"]
-                file = file["file"]
+                # kept as is, consumers only read the meta keys they know
+                file_meta, file = file, file["file"]
             if isinstance(file, str):
-                if (
-                    os.path.isfile(file)
-                    and os.access(file, os.R_OK)
-                    and validate_path(file)
-                ):
-                    mime_type = mime.guess_type(file)
-                    f = open(file, mode="rb")
-                    _, file_name = os.path.split(f.name)
-                    u = FileStorage(f, file_name, content_type=mime_type[0])
-                    temp.append((u, file_meta))
+                if validate_path(file) and is_readable_file(file):
+                    ref = AttachmentRef(file, content_type=guess_type(file)[0])
+                    temp.append((ref, file_meta))
                 else:
                     raise WrongFile(
                         "incorrect file path for attachment or not readable"
                     )
             elif isinstance(file, FileStorage):
                 temp.append((file, file_meta))
+            elif isinstance(file, tuple) and len(file) == 2:
+                # in memory (filename, data), no file has to be written first,
+                # the stream is rewound so the message can be sent again
+                filename, data = file
+                fsob = FileStorage(
+                    io.BytesIO(data), filename, content_type=guess_type(filename)[0]
+                )
+                temp.append((fsob, file_meta))
             else:
                 raise WrongFile(
-                    "attachments field type incorrect, must be FileStorage or path"
+                    "attachments field type incorrect, "
+                    "must be FileStorage, path or (filename, bytes)"
                 )
         return temp
 
@@ -125,8 +229,7 @@ class Message(BaseModel):
         :param `headers`: dictionary of headers
         """
         if content_type is None:
-            mime = MimeTypes()
-            content_type = mime.guess_type(filename)
+            content_type = guess_type(filename)[0]
 
         fsob: "FileStorage" = FileStorage(
             io.BytesIO(data), filename, content_type=content_type, headers=headers
@@ -135,12 +238,32 @@ class Message(BaseModel):
         self.attachments.append(fsob)
         return True
 
-    class Config:
-        arbitrary_types_allowed = True
-
 
 def validate_path(path):
-    cur_dir = os.path.abspath(os.curdir)
-    requested_path = os.path.abspath(os.path.relpath(path, start=cur_dir))
-    common_prefix = os.path.commonprefix([requested_path, cur_dir])
-    return common_prefix == cur_dir
+    """Check that `path` resolves to somewhere under the working directory."""
+    cur_dir = os.getcwd()
+    requested_path = os.path.normpath(os.path.join(cur_dir, path))
+    return requested_path.startswith(os.path.join(cur_dir, ""))
+
+
+def is_readable_file(path) -> bool:
+    """Check that `path` is a regular file the running process can read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    # the mode bits alone don't say which of them apply to this process
+    return stat.S_ISREG(st.st_mode) and os.access(path, os.R_OK)
+
+
+def guess_type(filename: str):
+    """Guess the mime type of a file name, memoized on its extensions."""
+    name = os.path.basename(filename)
+    dot = name.find(".")
+    return _guess_type(name[dot:] if dot != -1 else "")
+
+
+@lru_cache(maxsize=1024)
+def _guess_type(extensions: str):
+    # mimetypes only looks at the extensions, so they are an exact cache key
+    return _MIME.guess_type("file" + extensions)
@@ -1,3 +1,21 @@
-from .email_check import DefaultChecker, WhoIsXmlApi
+import importlib
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .email_check import DefaultChecker, WhoIsXmlApi
 
 __all__ = ["DefaultChecker", "WhoIsXmlApi"]
+
+
+def __getattr__(name: str):
+    # `email_check` imports dnspython and the optional redis/httpx clients,
+    # so it is only loaded once one of the checkers is actually used.
+    if name in __all__:
+        value = getattr(importlib.import_module(".email_check", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
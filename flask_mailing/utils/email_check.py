@@ -1,7 +1,13 @@
-import inspect
+import asyncio
+import sys
+import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any, List, Set
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+import dns.asyncresolver
 import dns.exception
 import dns.resolver
 
@@ -19,11 +25,146 @@ try:
 except:
     request_lib = False
 
-from pydantic import EmailStr
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
+from ..schemas import validate_email_address
 from .errors import ApiError, DBProvaiderError
 
 
+# domain -> (expires at, mx record or None), in least recently used order
+MX_CACHE: Dict[str, Tuple[float, Optional[dict]]] = {}
+MX_CACHE_TTL = 300
+MX_CACHE_SIZE = 1000
+DNS_TIMEOUT = 5.0
+
+# source url -> (fetched at, temporary domains)
+TEMP_DOMAINS_CACHE: Dict[str, Tuple[float, Tuple[str, ...]]] = {}
+TEMP_DOMAINS_TTL = 24 * 60 * 60
+
+
+# domain -> MX lookup in progress, concurrent checks of a domain share one query
+_MX_INFLIGHT: Dict[str, "asyncio.Future"] = {}
+
+
+async def resolve_mx(domain: str) -> Optional[Tuple[float, Optional[dict]]]:
+    """
+    Resolve MX records, returns (expires at, mx record or None) or None if
+    the resolver failed rather than answered.
+    """
+    ttl = MX_CACHE_TTL
+    try:
+        mx_records = await get_resolver().resolve(domain, "MX", lifetime=DNS_TIMEOUT)
+        record = {"port": mx_records.port, "nameserver": mx_records.nameserver}
+        ttl = min(mx_records.rrset.ttl, MX_CACHE_TTL)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        record = None
+    except (dns.resolver.NoNameservers, dns.exception.Timeout):
+        # resolver trouble, not an answer about the domain
+        return None
+    return time.monotonic() + ttl, record
+
+
+async def lookup_mx(domain: str) -> Optional[Tuple[float, Optional[dict]]]:
+    """`resolve_mx`, joining a lookup of the same domain that is already running"""
+    pending = _MX_INFLIGHT.get(domain)
+    if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+        pending = _MX_INFLIGHT[domain] = asyncio.ensure_future(resolve_mx(domain))
+
+        def done(future):
+            if _MX_INFLIGHT.get(domain) is future:
+                del _MX_INFLIGHT[domain]
+
+        pending.add_done_callback(done)
+    # shielded, a cancelled caller mustn't cancel the query for the others
+    return await asyncio.shield(pending)
+
+
+# shared httpx client and the event loop it belongs to
+_http_client: Optional["httpx.AsyncClient"] = None
+_http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    Shared httpx client, so repeated requests reuse keep-alive connections.
+    It is bound to the loop it was opened on: apps running one long lived
+    loop open it at startup and close it with `close_http_client()`.
+    """
+    global _http_client, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is not None and not _http_client.is_closed:
+        if _http_loop is loop:
+            return _http_client
+        if not _http_loop.is_closed():
+            raise RuntimeError(
+                "The shared httpx client belongs to another event loop, "
+                "close it with close_http_client() on that loop first"
+            )
+    _http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    )
+    _http_loop = loop
+    return _http_client
+
+
+@asynccontextmanager
+async def http_client():
+    """
+    The shared httpx client when it was opened on the running loop, else a
+    client for this call only, closed on exit. Flask runs every async view
+    inside its own event loop, a client left open there would leak its sockets.
+    """
+    if (
+        _http_client is not None
+        and not _http_client.is_closed
+        and _http_loop is asyncio.get_running_loop()
+    ):
+        yield _http_client
+        return
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+async def close_http_client() -> None:
+    """Close the shared httpx client if it was created on the running loop"""
+    global _http_client
+    if _http_client is not None and _http_loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+        _http_client = None
+
+
+@lru_cache(maxsize=1)
+def get_resolver() -> dns.asyncresolver.Resolver:
+    """Shared async resolver, so resolv.conf is only read once."""
+    return dns.asyncresolver.Resolver()
+
+
+def normalize_domain(domain: str) -> str:
+    """Lower-case and strip a domain, interned so set lookups compare by identity."""
+    return sys.intern(domain.strip().rstrip(".").lower())
+
+
+def normalize_email(email: str) -> str:
+    """Normalize the domain of an address, the local part may be case sensitive."""
+    local, at, domain = email.rpartition("@")
+    return local + at + normalize_domain(domain) if at else email
+
+
+def parent_domains(domain: str) -> List[str]:
+    """Return the domain followed by each of its parent domains."""
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)] or [domain]
+
+
+def email_domains(email: str) -> List[str]:
+    """Return the normalized domain of an address and its parents, empty without one."""
+    _, at, domain = email.rpartition("@")
+    return parent_domains(normalize_domain(domain)) if at and domain else []
+
+
 class AbstractEmailChecker(ABC):
     @abstractmethod
     def validate_email(self, email: str) -> bool:
@@ -81,10 +222,16 @@ class DefaultChecker(AbstractEmailChecker):
     ```
     """
 
-    TEMP_EMAIL_DOMAINS: List[str] = []
+    TEMP_EMAIL_DOMAINS: Set[str] = set()
     BLOCKED_DOMAINS: Set[str] = set()
     BLOCKED_ADDRESSES: Set[str] = set()
 
+    # redis connection pools shared by every checker with the same settings,
+    # per event loop as their connections can't be used from another one
+    _redis_pools: "weakref.WeakKeyDictionary[Any, Dict[Tuple, Any]]" = (
+        weakref.WeakKeyDictionary()
+    )
+
     def __init__(
         self,
         source: str = None,
@@ -123,59 +270,100 @@ class DefaultChecker(AbstractEmailChecker):
 
     def catch_all_check(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented"
+            "Func named catch_all_check not implemented"
             f" for class {self.__class__.__name__}"
         )
 
     async def init_redis(self):
         if not self.redis_enabled:
             raise DBProvaiderError(self.redis_error_msg)
-        if not hasattr(self, "redis_client"):
-            self.redis_client = await aioredis.from_url(
-                address=f"{self.redis_host}:{self.redis_port}",
-                db=self.redis_db,
-                password=self.redis_pass,
-                encoding="UTF-8",
-                **self.options,
-            )
+        loop = asyncio.get_running_loop()
+        if getattr(self, "_redis_loop", None) is not loop:
+            self.redis_client = aioredis.Redis(connection_pool=self._get_redis_pool())
+            self._redis_loop = loop
 
-        temp_counter = await self.redis_client.get("temp_counter")
-        domain_counter = await self.redis_client.get("domain_counter")
-        blocked_emails = await self.redis_client.get("email_counter")
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for counter in ("temp_counter", "domain_counter", "email_counter"):
+                pipe.set(counter, 0, nx=True)
+            await pipe.execute()
 
-        if not temp_counter:
-            await self.redis_client.set("temp_counter", 0)
-        if not domain_counter:
-            await self.redis_client.set("domain_counter", 0)
-        if not blocked_emails:
-            await self.redis_client.set("email_counter", 0)
         temp_domains = await self.fetch_temp_email_domains()
-        check_key = await self.redis_client.hgetall("temp_domains")
-        if not check_key:
-            kwargs = {
-                domain: await self.redis_client.incr("temp_counter")
-                for domain in temp_domains
-            }
-            await self.redis_client.hmset_dict("temp_domains", kwargs)
+        if not await self.redis_client.exists("temp_domains"):
+            await self._add_temp_domains(temp_domains)
 
         return True
 
+    def _get_redis_pool(self):
+        """The connection pool of the running loop for this checker's settings"""
+        pools = self._redis_pools.setdefault(asyncio.get_running_loop(), {})
+        key = (
+            self.redis_host,
+            self.redis_port,
+            self.redis_db,
+            self.redis_pass,
+            tuple(sorted(self.options.items())),
+        )
+        try:
+            pool = pools.get(key)
+        except TypeError:  # unhashable options, the pool isn't shared
+            key, pool = None, None
+        if pool is None:
+            pool = aioredis.ConnectionPool.from_url(
+                f"{self.redis_host}:{self.redis_port}",
+                db=self.redis_db,
+                password=self.redis_pass,
+                encoding="UTF-8",
+                **self.options,
+            )
+            if key is not None:
+                pools[key] = pool
+        return pool
+
+    async def _add_temp_domains(self, domains: List[str]):
+        """Store new temporary domains in redis, numbering them with one INCRBY"""
+        domains = list(dict.fromkeys(domains))
+        if not domains:
+            return
+        last = await self.redis_client.incrby("temp_counter", len(domains))
+        first = last - len(domains) + 1
+        await self.redis_client.hset(
+            "temp_domains", mapping=dict(zip(domains, range(first, last + 1)))
+        )
+
     def validate_email(self, email: str) -> bool:
         """Validate email address"""
-        EmailStr._validate(email, {})
+        validate_email_address(email)
         return True
 
     async def fetch_temp_email_domains(self):
-        """Async request to source param resource"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(self.source)
-            if self.redis_enabled:
-                return response.text.split("\n")
+        """
+        Async request to source param resource, the list is downloaded
+        at most once every `TEMP_DOMAINS_TTL` seconds per source. An error
+        status raises `httpx.HTTPStatusError` and nothing is cached.
+        """
+        hit = TEMP_DOMAINS_CACHE.get(self.source)
+        if hit is not None and time.monotonic() - hit[0] < TEMP_DOMAINS_TTL:
+            domains = hit[1]
+        else:
+            # streamed line by line, the whole list is never held as one string
+            lines = []
+            async with http_client() as client:
+                async with client.stream("GET", self.source) as response:
+                    # an error page must not be cached as a list of domains
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            lines.append(normalize_domain(line))
+            domains = tuple(lines)
+            TEMP_DOMAINS_CACHE[self.source] = (time.monotonic(), domains)
 
-            self.TEMP_EMAIL_DOMAINS.extend(response.text.split("\n"))
+        if self.redis_enabled:
+            return list(domains)
+        self.TEMP_EMAIL_DOMAINS.update(domains)
 
     async def blacklist_add_domain(self, domain: str):
         """Add domain to blacklist"""
+        domain = normalize_domain(domain)
         if self.redis_enabled:
             result = await self.redis_client.hget("blocked_domains", domain)
             if not result:
@@ -185,6 +373,7 @@ class DefaultChecker(AbstractEmailChecker):
             self.BLOCKED_DOMAINS.add(domain)
 
     async def blacklist_rm_domain(self, domain: str):
+        domain = normalize_domain(domain)
         if self.redis_enabled:
             res = await self.redis_client.hdel("blocked_domains", domain)
             if res:
@@ -195,6 +384,7 @@ class DefaultChecker(AbstractEmailChecker):
     async def blacklist_add_email(self, email: str):
         """Add email address to blacklist"""
         if self.validate_email(email):
+            email = normalize_email(email)
             if self.redis_enabled:
                 blocked_domain = await self.redis_client.hget("blocked_emails", email)
                 if not blocked_domain:
@@ -204,6 +394,7 @@ class DefaultChecker(AbstractEmailChecker):
                 self.BLOCKED_ADDRESSES.add(email)
 
     async def blacklist_rm_email(self, email: str):
+        email = normalize_email(email)
         if self.redis_enabled:
             res = await self.redis_client.hdel("blocked_emails", email)
             if res:
@@ -213,16 +404,18 @@ class DefaultChecker(AbstractEmailChecker):
 
     async def add_temp_domain(self, domain_lists: List[str]):
         """Manually add temporary email"""
+        domain_lists = [normalize_domain(domain) for domain in domain_lists]
         if self.redis_enabled:
-            for domain in domain_lists:
-                temp_email = await self.redis_client.hget("temp_domains", domain)
-                if not temp_email:
-                    incr = await self.redis_client.incr("temp_counter")
-                    await self.redis_client.hset("temp_domains", domain, incr)
+            if domain_lists:
+                known = await self.redis_client.hmget("temp_domains", *domain_lists)
+                await self._add_temp_domains(
+                    [domain for domain, hit in zip(domain_lists, known) if not hit]
+                )
         else:
-            self.TEMP_EMAIL_DOMAINS.extend(domain_lists)
+            self.TEMP_EMAIL_DOMAINS.update(domain_lists)
 
     async def blacklist_rm_temp(self, domain: str):
+        domain = normalize_domain(domain)
         if self.redis_enabled:
             res = await self.redis_client.hdel("temp_domains", domain)
             if res:
@@ -231,51 +424,112 @@ class DefaultChecker(AbstractEmailChecker):
             self.TEMP_EMAIL_DOMAINS.remove(domain)
         return True
 
-    async def is_dispasoble(self, email: str) -> bool:
-        """Check email address is temporary or not"""
-        if self.validate_email(email):
-            _, domain = email.split("@")
-            result = None
-            if self.redis_enabled:
-                result = await self.redis_client.hget("temp_domains", domain)
-                return bool(result)
-            return domain in self.TEMP_EMAIL_DOMAINS
-        return False
+    async def is_dispasoble(self, email: str, strict: bool = True) -> bool:
+        """
+        Check email address is temporary or not, subdomains of a temporary domain count too.
+        Pass `strict=False` for addresses validated already, only the domain is split off then.
+        """
+        if strict:
+            self.validate_email(email)
+        domains = email_domains(email)
+        if not domains:
+            return False
+        if self.redis_enabled:
+            result = await self.redis_client.hmget("temp_domains", *domains)
+            return any(result)
+        return not self.TEMP_EMAIL_DOMAINS.isdisjoint(domains)
+
+    async def is_dispasoble_bulk(
+        self, emails: List[str], strict: bool = True
+    ) -> List[bool]:
+        """`is_dispasoble` for a list of addresses, redis is asked with a single HMGET"""
+        if strict:
+            for email in emails:
+                self.validate_email(email)
+        domains = [email_domains(email) for email in emails]
+        temp_domains = self.TEMP_EMAIL_DOMAINS
+        if self.redis_enabled:
+            unique = list(dict.fromkeys(d for parents in domains for d in parents))
+            result = []
+            if unique:
+                result = await self.redis_client.hmget("temp_domains", *unique)
+            temp_domains = {domain for domain, hit in zip(unique, result) if hit}
+        return [not temp_domains.isdisjoint(parents) for parents in domains]
 
     async def is_blocked_domain(self, domain: str):
-        """Check blocked email domain"""
+        """Check blocked email domain, subdomains of a blocked domain are blocked too"""
+        domains = parent_domains(normalize_domain(domain))
         if not self.redis_enabled:
-            return domain in self.BLOCKED_DOMAINS
-
-        blocked_email = await self.redis_client.hget("blocked_domains", domain)
-        return bool(blocked_email)
+            return not self.BLOCKED_DOMAINS.isdisjoint(domains)
 
-    async def is_blocked_address(self, email: str):
-        """Check blocked email address"""
-        if self.validate_email(email):
-            if not self.redis_enabled:
-                return email in self.BLOCKED_ADDRESSES
+        blocked_email = await self.redis_client.hmget("blocked_domains", *domains)
+        return any(blocked_email)
 
-            blocked_domain = await self.redis_client.hget("blocked_emails", email)
-            return bool(blocked_domain)
+    async def is_blocked_address(self, email: str, strict: bool = True):
+        """Check blocked email address, `strict=False` skips validating it"""
+        if strict:
+            self.validate_email(email)
+        email = normalize_email(email)
+        if not self.redis_enabled:
+            return email in self.BLOCKED_ADDRESSES
+
+        blocked_domain = await self.redis_client.hget("blocked_emails", email)
+        return bool(blocked_domain)
+
+    async def is_blocked_address_bulk(
+        self, emails: List[str], strict: bool = True
+    ) -> List[bool]:
+        """`is_blocked_address` for a list of addresses, redis is asked with a single HMGET"""
+        if strict:
+            for email in emails:
+                self.validate_email(email)
+        emails = [normalize_email(email) for email in emails]
+        if not self.redis_enabled:
+            blocked = self.BLOCKED_ADDRESSES
+            return [email in blocked for email in emails]
+        if not emails:
+            return []
+        result = await self.redis_client.hmget("blocked_emails", *emails)
+        return [bool(hit) for hit in result]
 
     async def check_mx_record(self, domain: str, full_result: bool = False):
-        """Check domain MX records"""
+        """
+        Check domain MX records, verdicts are cached for the record TTL,
+        at most `MX_CACHE_TTL` seconds
+        """
 
-        try:
-            mx_records = dns.resolver.resolve(domain, "MX")
-            return (
-                {"port": mx_records.port, "nameserver": mx_records.nameserver}
-                if full_result
-                else True
-            )
-        except (
-            dns.resolver.NXDOMAIN,
-            dns.resolver.NoAnswer,
-            dns.resolver.NoNameservers,
-            dns.exception.Timeout,
-        ):
+        key = domain.lower()
+        hit = MX_CACHE.pop(key, None)
+        if hit is None or time.monotonic() >= hit[0]:
+            hit = await lookup_mx(key)
+            if hit is None:
+                return False
+        if len(MX_CACHE) >= MX_CACHE_SIZE:
+            del MX_CACHE[next(iter(MX_CACHE))]
+        # re-inserted on every lookup, so the first key is the least recently used
+        MX_CACHE[key] = hit
+
+        record = hit[1]
+        if record is None:
             return False
+        return dict(record) if full_result else True
+
+    async def check_mx_records(
+        self, domains: List[str], full_result: bool = False, concurrency: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Check the MX records of many domains concurrently, at most
+        `concurrency` lookups are in flight at once
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        unique = list(dict.fromkeys(domains))
+
+        async def check(domain: str):
+            async with semaphore:
+                return await self.check_mx_record(domain, full_result)
+
+        results = await asyncio.gather(*(check(domain) for domain in unique))
+        return dict(zip(unique, results))
 
     async def blocked_email_count(self):
         """count all blocked emails in redis"""
@@ -296,12 +550,20 @@ class DefaultChecker(AbstractEmailChecker):
         return len(self.TEMP_EMAIL_DOMAINS)
 
     async def close_connections(self):
-        """for correctly close connection from redis"""
+        """for correctly close connection from redis, the shared pool stays open"""
+        await close_http_client()
         if self.redis_enabled:
             await self.redis_client.close()
             return True
         raise DBProvaiderError(self.redis_error_msg)
 
+    @classmethod
+    async def close_redis_pools(cls):
+        """Disconnect the redis connection pools of the running loop"""
+        pools = cls._redis_pools.pop(asyncio.get_running_loop(), {})
+        for pool in pools.values():
+            await pool.disconnect()
+
 
 class WhoIsXmlApi:
     """
@@ -336,20 +598,20 @@ class WhoIsXmlApi:
         self.host = "https://emailverification.whoisxmlapi.com/api/v1"
 
     async def fetch_info(self):
-        async with httpx.AsyncClient() as client:
-            params = {"apiKey": self.token, "emailAddress": self.email}
+        params = {"apiKey": self.token, "emailAddress": self.email}
+        async with http_client() as client:
             response = await client.get(self.host, params=params)
 
-            if response.status_code == 200:
-                data = response.json
-                self.smtp_check = data["smtpCheck"]
-                self.dns_check = data["dnsCheck"]
-                self.free_check = data["freeCheck"]
-                self.disposable = data["disposableCheck"]
-                self.catch_all = data["catchAllCheck"]
-                self.mx_records = data["mxRecords"]
+        if response.status_code == 200:
+            data = json_loads(response.content)
+            self.smtp_check = data["smtpCheck"]
+            self.dns_check = data["dnsCheck"]
+            self.free_check = data["freeCheck"]
+            self.disposable = data["disposableCheck"]
+            self.catch_all = data["catchAllCheck"]
+            self.mx_records = data["mxRecords"]
 
-                return True
+            return True
 
         raise ApiError(
             "Response status code is {}, error msg {}".format(
@@ -359,7 +621,7 @@ class WhoIsXmlApi:
 
     def validate_email(self, email: str):
         """Validate email address"""
-        if EmailStr._validate(email, {}):
+        if validate_email_address(email):
             return True
 
     def catch_all_check(self):
@@ -426,30 +688,30 @@ class WhoIsXmlApi:
 
     def blacklist_add_email(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented "
+            "Func named blacklist_add_email not implemented "
             f"for class {self.__class__.__name__}"
         )
 
     def blacklist_add_domain(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented "
+            "Func named blacklist_add_domain not implemented "
             f"for class {self.__class__.__name__}"
         )
 
     def add_temp_domain(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented "
+            "Func named add_temp_domain not implemented "
             f"for class {self.__class__.__name__}"
         )
 
     def is_blocked_domain(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented "
+            "Func named is_blocked_domain not implemented "
             f"for class {self.__class__.__name__}"
         )
 
     def is_blocked_address(self):
         raise NotImplementedError(
-            f"Func named {inspect.currentframe().f_code.co_name} not implemented "
+            "Func named is_blocked_address not implemented "
             f"for class {self.__class__.__name__}"
         )
@@ -34,6 +34,14 @@ def default_checker():
 #     await test.close_connections()
 
 
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    # attachment paths are checked against the working directory
+    root = Path(__file__).resolve().parent.parent
+    monkeypatch.chdir(root)
+    return root
+
+
 @pytest.fixture(autouse=True)
 def mail_config():
     home: Path = Path(__file__).parent.parent
@@ -1,12 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
 import pytest
 
+from flask_mailing.utils import email_check
+from flask_mailing.utils.email_check import (
+    normalize_domain,
+    normalize_email,
+    parent_domains,
+)
 from flask_mailing.utils.errors import DBProvaiderError
 
 
+def use_http_client(monkeypatch, client):
+    @asynccontextmanager
+    async def http_client():
+        yield client
+
+    monkeypatch.setattr(email_check, "http_client", http_client)
+
+
 @pytest.mark.asyncio
 async def test_default_checker(default_checker):
     await default_checker.fetch_temp_email_domains()
-    assert default_checker.TEMP_EMAIL_DOMAINS != []
+    assert default_checker.TEMP_EMAIL_DOMAINS != set()
 
     email = "tural_m@hotmail.com"
     domain = email.split("@")[-1]
@@ -41,3 +59,322 @@ async def test_default_checker(default_checker):
 
     with pytest.raises(DBProvaiderError):
         await default_checker.close_connections()
+
+
+def test_domain_helpers():
+    assert normalize_domain(" Mail.Example.COM. ") == "mail.example.com"
+    assert parent_domains("a.example.co.uk") == [
+        "a.example.co.uk",
+        "example.co.uk",
+        "co.uk",
+    ]
+    assert parent_domains("localhost") == ["localhost"]
+    assert normalize_email("John.Doe@Example.COM") == "John.Doe@example.com"
+    assert normalize_email("no-domain") == "no-domain"
+
+
+@pytest.mark.asyncio
+async def test_dispasoble_subdomains():
+    checker = SimpleNamespace(
+        redis_enabled=False,
+        TEMP_EMAIL_DOMAINS={"mailinator.com"},
+        validate_email=lambda email: True,
+    )
+    is_dispasoble = email_check.DefaultChecker.is_dispasoble
+
+    assert await is_dispasoble(checker, "user@mailinator.com") is True
+    assert await is_dispasoble(checker, "user@Foo.Mailinator.com") is True
+    assert await is_dispasoble(checker, "user@notmailinator.com") is False
+    assert await is_dispasoble(checker, "user@example.com") is False
+    assert await is_dispasoble(checker, "user@mailinator.com", strict=False) is True
+    assert await is_dispasoble(checker, "not-an-email", strict=False) is False
+    checker.TEMP_EMAIL_DOMAINS.add("not-an-email")
+    assert await is_dispasoble(checker, "not-an-email", strict=False) is False
+
+
+@pytest.mark.asyncio
+async def test_bulk_checks():
+    class Redis:
+        async def hmget(self, name, *keys):
+            return [key in ("mailinator.com", "User@example.com") for key in keys]
+
+    checker = SimpleNamespace(
+        redis_enabled=False,
+        TEMP_EMAIL_DOMAINS={"mailinator.com"},
+        BLOCKED_ADDRESSES={"User@example.com"},
+        validate_email=lambda email: True,
+    )
+    is_dispasoble_bulk = email_check.DefaultChecker.is_dispasoble_bulk
+    is_blocked_address_bulk = email_check.DefaultChecker.is_blocked_address_bulk
+    emails = ["a@foo.mailinator.com", "User@Example.com", "b@example.com"]
+
+    for redis_enabled in (False, True):
+        checker.redis_enabled = redis_enabled
+        checker.redis_client = Redis()
+        assert await is_dispasoble_bulk(checker, emails) == [True, False, False]
+        assert await is_blocked_address_bulk(checker, emails) == [False, True, False]
+        assert await is_dispasoble_bulk(checker, []) == []
+        assert await is_blocked_address_bulk(checker, []) == []
+
+
+@pytest.mark.asyncio
+async def test_mx_record_cached(monkeypatch):
+    calls = []
+
+    class Answer:
+        port = 53
+        nameserver = "127.0.0.1"
+        rrset = SimpleNamespace(ttl=3600)
+
+    class Resolver:
+        async def resolve(self, domain, rdtype, lifetime):
+            calls.append(domain)
+            if domain == "missing.example":
+                raise email_check.dns.resolver.NXDOMAIN
+            return Answer()
+
+    monkeypatch.setattr(email_check, "get_resolver", Resolver)
+    monkeypatch.setattr(email_check, "MX_CACHE", {})
+    check_mx_record = email_check.DefaultChecker.check_mx_record
+
+    assert await check_mx_record(None, "example.com") is True
+    assert await check_mx_record(None, "Example.com", full_result=True) == {
+        "port": 53,
+        "nameserver": "127.0.0.1",
+    }
+    assert await check_mx_record(None, "missing.example") is False
+    assert await check_mx_record(None, "missing.example") is False
+    assert calls == ["example.com", "missing.example"]
+
+    Answer.rrset = SimpleNamespace(ttl=0)
+    assert await check_mx_record(None, "short.example") is True
+    assert await check_mx_record(None, "short.example") is True
+    assert calls[2:] == ["short.example", "short.example"]
+    assert list(email_check.MX_CACHE)[-1] == "short.example"
+
+
+@pytest.mark.asyncio
+async def test_mx_lookup_shared(monkeypatch):
+    calls = []
+
+    class Answer:
+        port = 53
+        nameserver = "127.0.0.1"
+        rrset = SimpleNamespace(ttl=3600)
+
+    class Resolver:
+        async def resolve(self, domain, rdtype, lifetime):
+            calls.append(domain)
+            await asyncio.sleep(0.01)
+            return Answer()
+
+    monkeypatch.setattr(email_check, "get_resolver", Resolver)
+    monkeypatch.setattr(email_check, "MX_CACHE", {})
+    check_mx_record = email_check.DefaultChecker.check_mx_record
+
+    results = await asyncio.gather(
+        *(check_mx_record(None, "example.com") for _ in range(10))
+    )
+    assert results == [True] * 10
+    assert calls == ["example.com"]
+    assert email_check._MX_INFLIGHT == {}
+
+
+@pytest.mark.asyncio
+async def test_check_mx_records(monkeypatch):
+    async def check_mx_record(domain, full_result):
+        return domain != "missing.example"
+
+    checker = SimpleNamespace(check_mx_record=check_mx_record)
+    check_mx_records = email_check.DefaultChecker.check_mx_records
+
+    assert await check_mx_records(
+        checker, ["example.com", "missing.example", "example.com"], concurrency=1
+    ) == {"example.com": True, "missing.example": False}
+
+
+@pytest.mark.asyncio
+async def test_add_temp_domain_redis():
+    class Redis:
+        def __init__(self):
+            self.counter = 1
+            self.hashes = {"temp_domains": {"known.com": 1}}
+            self.calls = 0
+
+        async def hmget(self, name, *keys):
+            self.calls += 1
+            return [self.hashes[name].get(key) for key in keys]
+
+        async def incrby(self, name, amount):
+            self.calls += 1
+            self.counter += amount
+            return self.counter
+
+        async def hset(self, name, mapping):
+            self.calls += 1
+            self.hashes[name].update(mapping)
+
+    checker = SimpleNamespace(redis_enabled=True, redis_client=Redis())
+    checker._add_temp_domains = email_check.DefaultChecker._add_temp_domains.__get__(
+        checker
+    )
+
+    await email_check.DefaultChecker.add_temp_domain(
+        checker, ["Known.com", "a.com", "b.com", "a.com"]
+    )
+    assert checker.redis_client.hashes["temp_domains"] == {
+        "known.com": 1,
+        "a.com": 2,
+        "b.com": 3,
+    }
+    assert checker.redis_client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_temp_email_domains(monkeypatch):
+    import httpx
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text="Temp.com\n\nmailinator.com.\n")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    use_http_client(monkeypatch, client)
+    monkeypatch.setattr(email_check, "TEMP_DOMAINS_CACHE", {})
+    checker = SimpleNamespace(
+        redis_enabled=False, source="https://example.com", TEMP_EMAIL_DOMAINS=set()
+    )
+    fetch = email_check.DefaultChecker.fetch_temp_email_domains
+
+    await fetch(checker)
+    assert checker.TEMP_EMAIL_DOMAINS == {"temp.com", "mailinator.com"}
+
+    checker.redis_enabled = True
+    assert await fetch(checker) == ["temp.com", "mailinator.com"]
+    assert len(requests) == 1
+
+    monkeypatch.setattr(email_check, "TEMP_DOMAINS_TTL", 0)
+    await fetch(checker)
+    assert len(requests) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_temp_email_domains_error_not_cached(monkeypatch):
+    import httpx
+
+    def handler(request):
+        return httpx.Response(404, text="<html>Not Found</html>")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    use_http_client(monkeypatch, client)
+    monkeypatch.setattr(email_check, "TEMP_DOMAINS_CACHE", {})
+    checker = SimpleNamespace(
+        redis_enabled=False, source="https://example.com", TEMP_EMAIL_DOMAINS=set()
+    )
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await email_check.DefaultChecker.fetch_temp_email_domains(checker)
+    assert email_check.TEMP_DOMAINS_CACHE == {}
+    assert checker.TEMP_EMAIL_DOMAINS == set()
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_whoisxmlapi_fetch_info(monkeypatch):
+    import httpx
+
+    def handler(request):
+        return httpx.Response(
+            200,
+            json={
+                "smtpCheck": "true",
+                "dnsCheck": "true",
+                "freeCheck": "false",
+                "disposableCheck": "false",
+                "catchAllCheck": "false",
+                "mxRecords": ["mx.example.com"],
+            },
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    use_http_client(monkeypatch, client)
+    who_is = email_check.WhoIsXmlApi(token="token", email="user@example.com")
+
+    assert await who_is.fetch_info() is True
+    assert who_is.smtp_check_() == "true"
+    assert who_is.check_mx_record() == ["mx.example.com"]
+    await client.aclose()
+
+
+def test_http_client_per_loop():
+    async def open_client():
+        client = email_check.get_http_client()
+        assert email_check.get_http_client() is client
+        async with email_check.http_client() as shared:
+            assert shared is client
+        return client
+
+    loop = asyncio.new_event_loop()
+    client = loop.run_until_complete(open_client())
+
+    async def other_loop():
+        # the shared client is still open on its own loop
+        with pytest.raises(RuntimeError):
+            email_check.get_http_client()
+        async with email_check.http_client() as own:
+            assert own is not client
+        assert own.is_closed
+        await email_check.close_http_client()
+
+    asyncio.run(other_loop())
+    assert not client.is_closed
+
+    loop.run_until_complete(email_check.close_http_client())
+    loop.close()
+    assert client.is_closed
+    assert email_check._http_client is None
+
+
+def test_redis_pools_shared_per_loop_and_settings(monkeypatch):
+    class ConnectionPool:
+        @classmethod
+        def from_url(cls, url, **kwargs):
+            return cls()
+
+    monkeypatch.setattr(email_check, "redis_lib", True)
+    monkeypatch.setattr(
+        email_check,
+        "aioredis",
+        SimpleNamespace(ConnectionPool=ConnectionPool),
+        raising=False,
+    )
+    monkeypatch.setattr(email_check.DefaultChecker, "_redis_pools", {})
+
+    def checker(**options):
+        return email_check.DefaultChecker(db_provider="redis", **options)
+
+    async def get_pools():
+        return (
+            checker()._get_redis_pool(),
+            checker()._get_redis_pool(),
+            checker(max_connections=5)._get_redis_pool(),
+            checker(redis_db=1)._get_redis_pool(),
+        )
+
+    first, same, other_options, other_db = asyncio.run(get_pools())
+    assert first is same
+    assert other_options is not first
+    assert other_db is not first
+    # a new event loop can't reuse the connections of the previous one
+    assert asyncio.run(get_pools())[0] is not first
+
+
+def test_validate_email():
+    validate_email = email_check.DefaultChecker.validate_email
+
+    assert validate_email(None, "user@example.com") is True
+    with pytest.raises(ValueError):
+        validate_email(None, "not-an-email")
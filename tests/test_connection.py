@@ -1,11 +1,16 @@
-import os
+import asyncio
+import threading
+import time
 import typing as t
+from pathlib import Path
 
 import pytest as pt
 
 from flask_mailing import Mail, Message
+from flask_mailing.errors import PydanticClassRequired
 
 CONTENT = "file test content"
+FILES_DIR = Path(__file__).resolve().parent.parent / "files"
 
 if t.TYPE_CHECKING is True:
     from flask import Flask
@@ -93,8 +98,7 @@ async def test_html_message(app: "Flask"):
 
 @pt.mark.asyncio
 async def test_attachement_message(app: "Flask"):
-    directory = os.getcwd()
-    attachement = directory + "/files/attachement.txt"
+    attachement = str(FILES_DIR / "attachement.txt")
 
     with open(attachement, "w") as file:
         file.write(CONTENT)
@@ -122,10 +126,31 @@ async def test_attachement_message(app: "Flask"):
         )
 
 
+@pt.mark.asyncio
+async def test_in_memory_attachment_sent_twice(app: "Flask"):
+    msg = Message(
+        subject="testing",
+        recipients=["to@example.com"],
+        body="test",
+        attachments=[("report.txt", b"in memory content")],
+    )
+    fm = Mail(app)
+
+    with fm.record_messages() as outbox:
+        # e.g. a retry, the caller still holds the bytes
+        await fm.send_message(message=msg)
+        await fm.send_message(message=msg)
+
+        assert len(outbox) == 2
+        for mail in outbox:
+            part = mail.get_payload()[1]
+            assert part.get_filename() == "report.txt"
+            assert part.get_payload(decode=True) == b"in memory content"
+
+
 @pt.mark.asyncio
 async def test_attachement_message_with_headers(app: "Flask"):
-    directory = os.getcwd()
-    attachement = directory + "/files/attachement.txt"
+    attachement = str(FILES_DIR / "attachement.txt")
 
     with open(attachement, "w") as file:
         file.write(CONTENT)
@@ -270,3 +295,348 @@ async def test_jinja_message_with_html(app: "Flask"):
     assert msg.template_body == ("\n    \n    \n        Andrej\n    \n\n")
 
     assert not msg.body
+
+
+@pt.mark.asyncio
+async def test_shared_connection(app: "Flask"):
+    fm = Mail(app)
+
+    with fm.record_messages() as outbox:
+        async with fm.connection() as conn:
+            for subject in ("test-subject-1", "test-subject-2"):
+                message = Message(
+                    subject=subject,
+                    recipients=["sabuhi.shukurov@gmail.com"],
+                    body="test",
+                )
+                await fm.send_message(message, connection=conn)
+
+        assert len(outbox) == 2
+        assert outbox[0]["Subject"] == "test-subject-1"
+        assert outbox[1]["Subject"] == "test-subject-2"
+
+
+@pt.mark.asyncio
+async def test_pool_reuses_connection(app: "Flask"):
+    app.config["MAIL_POOL_MAX_MESSAGES"] = 2
+    fm = Mail(app)
+    message = Message(subject="test", recipients=["to@example.com"], body="test")
+
+    async with fm.acquire() as conn1:
+        await fm.send_message(message, connection=conn1)
+    async with fm.acquire() as conn2:
+        await fm.send_message(message, connection=conn2)
+    async with fm.acquire() as conn3:
+        pass
+
+    assert conn1 is conn2
+    assert conn3 is not conn1
+
+
+@pt.mark.asyncio
+async def test_pool_drops_disconnected_connection(app: "Flask"):
+    fm = Mail(app)
+
+    async with fm.acquire() as conn1:
+        # the session was dropped, the pool must not keep it around
+        conn1.session.close()
+        assert not conn1.is_connected
+    async with fm.acquire() as conn2:
+        pass
+
+    assert conn2 is not conn1
+
+
+def test_pool_closes_connections_on_loop_shutdown(app: "Flask"):
+    fm = Mail(app)
+
+    async def borrow():
+        async with fm.acquire() as conn:
+            return conn
+
+    # Flask runs every async view with asyncio.run() in a new event loop
+    conn1 = asyncio.run(borrow())
+    assert not conn1.is_connected
+    conn2 = asyncio.run(borrow())
+    assert conn2 is not conn1
+
+
+def test_pool_keeps_connections_per_loop(app: "Flask"):
+    fm = Mail(app)
+    other_done = threading.Event()
+    result = {}
+
+    async def long_lived():
+        async with fm.acquire() as conn:
+            result["first"] = conn
+        # another view runs on its own loop and thread meanwhile
+        await asyncio.get_running_loop().run_in_executor(None, other_done.wait)
+        result["still_connected"] = result["first"].is_connected
+        async with fm.acquire() as conn:
+            result["again"] = conn
+
+    async def other_view():
+        async with fm.acquire() as conn:
+            result["other"] = conn
+
+    thread = threading.Thread(target=asyncio.run, args=(long_lived(),))
+    thread.start()
+    while "first" not in result:
+        time.sleep(0.001)
+    asyncio.run(other_view())
+    other_done.set()
+    thread.join()
+
+    assert result["other"] is not result["first"]
+    assert result["still_connected"]
+    assert result["again"] is result["first"]
+
+
+@pt.mark.asyncio
+async def test_send_many_reconnects(app: "Flask"):
+    app.config["MAIL_POOL_MAX_MESSAGES"] = 2
+    fm = Mail(app)
+    sessions = []
+
+    async with fm.connection() as conn:
+        for i in range(5):
+            await conn.send_many([f"message {i}"])
+            if conn.session not in sessions:
+                sessions.append(conn.session)
+
+    assert len(sessions) == 3
+    assert conn.messages_sent == 1
+
+
+@pt.mark.asyncio
+async def test_send_bulk(app: "Flask"):
+    fm = Mail(app)
+    messages = (
+        Message(subject=f"test {i}", recipients=["to@example.com"], body="test")
+        for i in range(3)
+    )
+
+    with fm.record_messages() as outbox:
+        await fm.send_bulk(messages)
+
+        assert [msg["subject"] for msg in outbox] == ["test 0", "test 1", "test 2"]
+
+
+@pt.mark.asyncio
+async def test_send_bulk_concurrency(app: "Flask"):
+    app.config["MAIL_POOL_SIZE"] = 3
+    fm = Mail(app)
+    messages = [
+        Message(subject=f"test {i}", recipients=["to@example.com"], body="test")
+        for i in range(10)
+    ]
+
+    with fm.record_messages() as outbox:
+        await fm.send_bulk(messages, concurrency=10)
+
+        assert sorted(msg["subject"] for msg in outbox) == sorted(
+            f"test {i}" for i in range(10)
+        )
+
+
+@pt.mark.asyncio
+async def test_send_bulk_uses_pool(app: "Flask"):
+    fm = Mail(app)
+    connections = set()
+
+    async def send(connection, msg):
+        connections.add(connection)
+
+    fm._send = send
+    messages = [
+        Message(subject=f"test {i}", recipients=["to@example.com"], body="test")
+        for i in range(3)
+    ]
+    await fm.send_bulk(messages)
+
+    async with fm.acquire() as conn:
+        assert connections == {conn}
+
+
+@pt.mark.asyncio
+async def test_send_mass_mail_uses_pool(app: "Flask"):
+    fm = Mail(app)
+    connections = set()
+
+    async def send(connection, msg):
+        connections.add(connection)
+
+    fm._send = send
+    await fm.send_mass_mail(
+        (f"subject-{i}", "body", ["to@example.com"]) for i in range(3)
+    )
+
+    async with fm.acquire() as conn:
+        assert connections == {conn}
+
+
+@pt.mark.asyncio
+async def test_send_bulk_failure_stops_other_workers(app: "Flask"):
+    fm = Mail(app)
+    sent = []
+
+    async def send(connection, msg):
+        await asyncio.sleep(0)
+        sent.append(msg["subject"])
+
+    fm._send = send
+    messages = [
+        Message(subject=f"test {i}", recipients=["to@example.com"], body="test")
+        for i in range(10)
+    ]
+    messages[1] = {"subject": "not a message"}
+
+    with pt.raises(PydanticClassRequired):
+        await fm.send_bulk(messages, concurrency=2)
+    # a worker left running would keep sending in the background
+    await asyncio.sleep(0.01)
+
+    # the other worker only got through the messages it had already started
+    assert len(sent) <= 2
+
+
+@pt.mark.asyncio
+async def test_send_bulk_renders_shared_template_once(app: "Flask"):
+    fm = Mail(app)
+    rendered = []
+    render_template = fm._render_template
+
+    def count_render(template, template_body):
+        rendered.append(template_body)
+        return render_template(template, template_body)
+
+    fm._render_template = count_render
+    bodies = [{"name": "Andrej"}, {"name": "Andrej"}, {"name": "Tural"}]
+    messages = [
+        Message(subject="test", recipients=["to@example.com"], template_body=body)
+        for body in bodies
+    ]
+
+    with fm.record_messages() as outbox:
+        await fm.send_bulk(messages, template_name="email_dict.html")
+
+        assert len(outbox) == 3
+    assert rendered == [{"name": "Andrej"}, {"name": "Tural"}]
+    assert [msg.template_body for msg in messages] == [
+        "\n   Andrej\n",
+        "\n   Andrej\n",
+        "\n   Tural\n",
+    ]
+
+
+@pt.mark.asyncio
+async def test_jinja_message_with_template_object(app: "Flask"):
+    fm = Mail(app)
+    template = fm.config.template_engine().get_template("email_dict.html")
+    msg = Message(
+        subject="testing",
+        recipients=["to@example.com"],
+        template_body={"name": "Andrej"},
+    )
+
+    with fm.record_messages() as outbox:
+        await fm.send_message(message=msg, template_name=template)
+
+        assert len(outbox) == 1
+    assert msg.template_body == ("\n   Andrej\n")
+    assert fm.config.template_engine() is template.environment
+
+
+@pt.mark.asyncio
+async def test_template_cached_by_name(app: "Flask"):
+    fm = Mail(app)
+
+    def make_message():
+        return Message(
+            subject="testing",
+            recipients=["to@example.com"],
+            template_body={"name": "Andrej"},
+        )
+
+    await fm.send_message(make_message(), template_name="email_dict.html")
+    template = fm._templates["email_dict.html"]
+    await fm.send_message(make_message(), template_name="email_dict.html")
+
+    assert fm._templates["email_dict.html"] is template
+
+
+def test_template_bytecode_cache(app: "Flask", tmp_path):
+    app.config["MAIL_TEMPLATE_CACHE_DIR"] = str(tmp_path)
+    fm = Mail(app)
+
+    fm.config.template_engine().get_template("email_dict.html")
+
+    assert list(tmp_path.glob("*.cache"))
+
+
+def test_make_dict():
+    data = {"name": "Andrej"}
+    message = Message(subject="test", recipients=["to@example.com"])
+
+    assert Mail.make_dict(data) is data
+    assert Mail.make_dict(message)["subject"] == "test"
+    assert Mail.make_dict([("name", "Andrej")]) == data
+
+    with pt.raises(ValueError):
+        Mail.make_dict(42)
+
+
+def test_template_engine_app_env(app: "Flask"):
+    app.config["MAIL_TEMPLATE_FOLDER"] = None
+    fm = Mail(app)
+
+    with app.app_context():
+        assert fm.config.template_engine() is app.jinja_env
+    # bound on first use, no app context is needed afterwards
+    assert fm.config.template_engine() is app.jinja_env
+
+
+@pt.mark.asyncio
+async def test_send_mass_mail_invalid_recipient(app: "Flask"):
+    fm = Mail(app)
+    datatuple = [
+        ("subject-0", "body-0", ["to@example.com"]),
+        ("subject-1", "body-1", ["not-an-email"]),
+        ("subject-2", "body-2", ["to@example.com"]),
+    ]
+
+    with fm.record_messages() as outbox:
+        with pt.raises(ValueError):
+            await fm.send_mass_mail(datatuple)
+
+        assert [msg["subject"] for msg in outbox] == ["subject-0"]
+
+
+@pt.mark.asyncio
+async def test_send_mass_mail_concurrency(app: "Flask"):
+    fm = Mail(app)
+
+    with fm.record_messages() as outbox:
+        await fm.send_mass_mail(
+            ((f"subject-{i}", "body", ["to@example.com"]) for i in range(10)),
+            concurrency=3,
+        )
+
+        assert sorted(msg["subject"] for msg in outbox) == sorted(
+            f"subject-{i}" for i in range(10)
+        )
+
+
+@pt.mark.asyncio
+async def test_send_mass_mail_generator(app: "Flask"):
+    fm = Mail(app)
+
+    with fm.record_messages() as outbox:
+        await fm.send_mass_mail(
+            (f"test-subject-{i}", "body", ["sabuhi.shukurov@gmail.com"])
+            for i in range(5)
+        )
+
+        assert [mail["Subject"] for mail in outbox] == [
+            f"test-subject-{i}" for i in range(5)
+        ]
@@ -5,3 +5,24 @@ def test_configuration(mail_config):
     conf = ConnectionConfig.model_validate(mail_config)
     assert conf.MAIL_USERNAME == "example@test.com"
     assert conf.MAIL_PORT == 25
+
+
+def test_smtp_kwargs_follow_config(mail_config):
+    conf = ConnectionConfig.model_validate(mail_config)
+    assert conf.smtp_kwargs["port"] == 25
+    assert "smtp_kwargs" not in dict(conf)
+
+    conf.MAIL_PORT = 587
+    assert conf.smtp_kwargs["port"] == 587
+    assert conf.model_copy(update={"MAIL_PORT": 2525}).smtp_kwargs["port"] == 2525
+
+
+def test_sender_follows_config(mail_config):
+    conf = ConnectionConfig.model_validate(mail_config)
+    assert conf.sender == "example <example@test.com>"
+    assert "sender" not in dict(conf)
+
+    conf.MAIL_FROM_NAME = None
+    assert conf.sender == "example@test.com"
+    copy = conf.model_copy(update={"MAIL_FROM_NAME": "other"})
+    assert copy.sender == "other <example@test.com>"
@@ -1,11 +1,25 @@
+import io
 import os
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 
 import pytest
-
-from flask_mailing.msg import MailMsg
-from flask_mailing.schemas import Message, MultipartSubtypeEnum
+from werkzeug.datastructures import FileStorage
+
+from flask_mailing.errors import WrongFile
+from flask_mailing.msg import CHUNK_SIZE, MailMsg, format_date
+from flask_mailing.schemas import (
+    AttachmentRef,
+    Message,
+    MultipartSubtypeEnum,
+    guess_type,
+    is_readable_file,
+    validate_email_address,
+    validate_path,
+)
 
 CONTENT = "file test content"
+FILES_DIR = Path(__file__).resolve().parent.parent / "files"
 
 
 def test_initialize():
@@ -85,8 +99,7 @@ def test_message_str():
 
 
 def test_plain_message_with_attachments():
-    directory = os.getcwd()
-    attachement = directory + "/files/attachement.txt"
+    attachement = str(FILES_DIR / "attachement.txt")
 
     with open(attachement, "w") as file:
         file.write(CONTENT)
@@ -101,9 +114,24 @@ def test_plain_message_with_attachments():
     assert len(msg.attachments) == 1
 
 
+def test_plain_message_with_bytes_attachment():
+    msg = Message(
+        subject="testing",
+        recipients=["to@example.com"],
+        attachments=[("attachement.txt", CONTENT.encode())],
+        body="test mail body",
+    )
+
+    assert len(msg.attachments) == 1
+    file, file_meta = msg.attachments[0]
+    assert file.filename == "attachement.txt"
+    assert file.content_type == "text/plain"
+    assert file.read() == CONTENT.encode()
+    assert file_meta is None
+
+
 def test_plain_message_with_attach_method():
-    directory = os.getcwd()
-    attachement = directory + "/files/attachement_1.txt"
+    attachement = str(FILES_DIR / "attachement_1.txt")
 
     msg = Message(
         subject="testing", recipients=["to@example.com"], body="test mail body"
@@ -184,3 +212,167 @@ async def test_message_charset():
     msg_object = await msg._message("test@example.com")
     assert msg_object._charset is not None
     assert msg_object._charset == "utf-8"
+
+
+def test_message_id_and_date():
+    first, second = MailMsg(), MailMsg()
+
+    assert first.msgId != second.msgId
+    assert parsedate_to_datetime(format_date()).tzinfo is not None
+
+
+def test_mimetext_7bit():
+    msg = MailMsg(charset="utf-8")
+
+    part = msg._mimetext("ascii body")
+    assert part["Content-Transfer-Encoding"] == "7bit"
+    assert part.get_content_charset() == "utf-8"
+    assert part.get_payload(decode=True) == b"ascii body"
+    assert part.items() == [
+        ("Content-Type", 'text/plain; charset="utf-8"'),
+        ("MIME-Version", "1.0"),
+        ("Content-Transfer-Encoding", "7bit"),
+    ]
+    assert part.as_string().endswith("\n\nascii body")
+
+    part = msg._mimetext("non ascii body ü")
+    assert part["Content-Transfer-Encoding"] == "base64"
+
+    part = msg._mimetext("x" * 999)
+    assert part["Content-Transfer-Encoding"] == "base64"
+
+    part = MailMsg(charset="utf-16")._mimetext("ascii body")
+    assert part["Content-Transfer-Encoding"] == "base64"
+
+
+def test_guess_type():
+    assert guess_type("/some/where/attachment.txt") == ("text/plain", None)
+    assert guess_type("archive.tar.gz") == ("application/x-tar", "gzip")
+    assert guess_type("README") == (None, None)
+
+
+def test_simple_message():
+    message = Message.simple("test subject", "To@Example.com", "test body")
+    expected = Message(
+        subject="test subject", recipients=["To@Example.com"], body="test body"
+    )
+    assert message.model_dump() == expected.model_dump()
+
+    with pytest.raises(ValueError):
+        Message.simple("test subject", "not-an-email", "test body")
+
+
+def test_fast_message():
+    message = Message(
+        subject="test subject",
+        recipients=["to@example.com"],
+        body="test body",
+        attachments=[str(FILES_DIR / "attachement.txt")],
+    )
+    copy = Message.fast(**{**dict(message), "recipients": ["other@example.com"]})
+
+    assert copy.recipients == ["other@example.com"]
+    assert copy.attachments is message.attachments
+    assert copy.subject == message.subject
+
+
+@pytest.mark.asyncio
+async def test_fast_copies_send_shared_attachment():
+    message = Message(
+        subject="test subject",
+        recipients=["to@example.com"],
+        body="test body",
+        attachments=[FileStorage(io.BytesIO(b"hello world"), "a.txt")],
+    )
+    copies = [
+        Message.fast(**{**dict(message), "recipients": [recipient]})
+        for recipient in ("one@example.com", "two@example.com")
+    ]
+
+    for copy in copies:
+        msg_object = await MailMsg(**dict(copy))._message("test@example.com")
+        part = msg_object.get_payload()[1]
+        assert part.get_payload(decode=True) == b"hello world"
+
+
+def test_validate_path():
+    assert validate_path("files/attachement.txt")
+    assert validate_path(str(FILES_DIR / ".." / "files" / "attachement.txt"))
+    assert not validate_path("../attachement.txt")
+    assert not validate_path(f"{FILES_DIR.parent}-other/attachement.txt")
+
+
+def test_validate_email_address():
+    assert validate_email_address("A@Example.COM") == "A@example.com"
+    assert validate_email_address("John <j@x.com>") == "j@x.com"
+
+    with pytest.raises(ValueError):
+        validate_email_address("a..b@example.com")
+
+    with pytest.raises(ValueError):
+        Message(subject="test subject", recipients=["not-an-email"])
+
+
+@pytest.mark.asyncio
+async def test_large_attachment_streamed():
+    attachement = str(FILES_DIR / "attachement_large.txt")
+    content = os.urandom(CHUNK_SIZE * 2 + 100)
+
+    with open(attachement, "wb") as file:
+        file.write(content)
+
+    try:
+        message = Message(
+            subject="test subject",
+            recipients=["to@example.com"],
+            body="test",
+            attachments=[attachement],
+        )
+        assert isinstance(message.attachments[0][0], AttachmentRef)
+
+        msg = MailMsg(**message.model_dump())
+        msg_object = await msg._message("test@example.com")
+        part = msg_object.get_payload()[1]
+        assert part.get_payload(decode=True) == content
+        assert part.get_filename() == "attachement_large.txt"
+    finally:
+        os.remove(attachement)
+
+
+@pytest.mark.skipif(
+    hasattr(os, "geteuid") and os.geteuid() == 0, reason="root reads any file"
+)
+def test_is_readable_file_checks_process_access():
+    attachement = str(FILES_DIR / "attachement_unreadable.txt")
+    with open(attachement, "w") as file:
+        file.write(CONTENT)
+
+    try:
+        # readable by others only, not by its owner
+        os.chmod(attachement, 0o004)
+        assert not is_readable_file(attachement)
+        os.chmod(attachement, 0o400)
+        assert is_readable_file(attachement)
+    finally:
+        os.remove(attachement)
+
+    assert not is_readable_file(str(FILES_DIR))
+
+
+@pytest.mark.asyncio
+async def test_attachment_read_error_raises_wrong_file():
+    attachement = str(FILES_DIR / "attachement_removed.txt")
+    with open(attachement, "w") as file:
+        file.write(CONTENT)
+
+    message = Message(
+        subject="test subject",
+        recipients=["to@example.com"],
+        body="test",
+        attachments=[attachement],
+    )
+    os.remove(attachement)
+
+    msg = MailMsg(**message.model_dump())
+    with pytest.raises(WrongFile):
+        await msg._message("test@example.com")